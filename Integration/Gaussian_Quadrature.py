@@ -1,37 +1,233 @@
 # Approximation of integrals using Gaussian quadrature
 
+import os
+import glob
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import matplotlib.pyplot as plt
 
+# Folder of the tabulated rules, found relative to this file rather than the working directory
+dataFolder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "GaussHermiteData")
+
+# Packed binary file holding the rules of every family
+ruleFilePath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "QuadratureRules.bin")
+
+# Gauss-Hermite rules already loaded or generated, keyed by number of points
+hermiteRules = {}
+
+# Layout of the packed rule file: a header, an index of rules, then the float64 data of each rule
+# (its points followed by its weights), all little-endian and 8-byte aligned
+ruleFileMagic = b"QUADRULE"
+ruleFileVersion = 1
+ruleHeaderType = np.dtype([('magic', 'S8'), ('version', '<u4'), ('count', '<u4')])
+ruleIndexType = np.dtype([('family', 'S16'), ('Np', '<i8'), ('offset', '<i8'), ('length', '<i8')])
+
+# Memory map and index of the packed rule file, opened on first use
+ruleFile = None
+ruleIndex = None
+
+# Writes quadrature rules to a packed binary file
+# The file is written beside the target and moved into place, so existing maps of the old file stay valid;
+# the module's map, index and loaded rules are then dropped so later lookups read the new file
+# Inputs
+#	path: file to write
+#	rules: dictionary mapping (family, Np) to (points, weights), e.g. ("hermite", 10)
+def writeRuleFile(path, rules):
+    global ruleFile, ruleIndex
+    keys = sorted(rules)
+    header = np.array([(ruleFileMagic, ruleFileVersion, len(keys))], dtype=ruleHeaderType)
+    index = np.zeros(len(keys), dtype=ruleIndexType)
+
+    offset = ruleHeaderType.itemsize + ruleIndexType.itemsize*len(keys)
+    for i, (family, Np) in enumerate(keys):
+        index[i] = (family.encode(), Np, offset, 2*Np)
+        offset += 2*Np*8
+
+    with open(path + ".tmp", "wb") as file:
+        file.write(header.tobytes())
+        file.write(index.tobytes())
+        for key in keys:
+            points, weights = rules[key]
+            file.write(np.concatenate((points, weights)).astype('<f8').tobytes())
+    os.replace(path + ".tmp", path)
+
+    ruleFile = None
+    ruleIndex = None
+    hermiteRules.clear()
+
+# Converts the tabulated Gauss-Hermite text files into a packed binary file
+# Inputs
+#	folder: folder holding the HermiteXW*.dat files
+#	path: file to write
+def convertDatFiles(folder=dataFolder, path=ruleFilePath):
+    rules = {}
+    for name in glob.glob(os.path.join(folder, "HermiteXW*.dat")):
+        data = np.loadtxt(name, usecols=(0, 1), ndmin=2)
+        rules[("hermite", data.shape[0])] = (data[:, 0], data[:, 1])
+    writeRuleFile(path, rules)
+
+# Returns a rule from the packed file, mapping the file into memory on first use
+# Only the bytes of the requested rule are read from disk
+# Inputs
+#	family: name of the rule family, e.g. "hermite"
+#	Np: number of integration points
+# Returns
+#	points, weights: read-only views into the file, or None if the file has no such rule
+def packedRule(family, Np):
+    global ruleFile, ruleIndex
+    if (ruleFile is None):
+        if (not os.path.exists(ruleFilePath)):
+            return None
+        mapped = np.memmap(ruleFilePath, dtype=np.uint8, mode='r')
+        header = mapped[:ruleHeaderType.itemsize].view(ruleHeaderType)[0]
+        if (header['magic'] != ruleFileMagic):
+            raise ValueError("Error: not a quadrature rule file")
+        if (header['version'] != ruleFileVersion):
+            raise ValueError("Error: unsupported quadrature rule file version " + str(header['version']))
+        start = ruleHeaderType.itemsize
+        index = mapped[start:start + ruleIndexType.itemsize*header['count']].view(ruleIndexType)
+        ruleIndex = {(entry['family'].decode(), int(entry['Np'])): (int(entry['offset']), int(entry['length']))
+                     for entry in index}
+        ruleFile = mapped
+
+    if ((family, Np) not in ruleIndex):
+        return None
+    offset, length = ruleIndex[(family, Np)]
+    data = ruleFile[offset:offset + 8*length].view('<f8')
+    return (data[:Np], data[Np:])
+
+# Generates the Gauss-Hermite rule with Np points using the Golub-Welsch eigenvalue method
+# Inputs
+#	Np: number of integration points
+# Returns
+#	points: the integration points
+#	weights: the weights of the points for the weight function exp(-x^2)
+def golubWelsch(Np):
+    offDiag = np.sqrt(np.arange(1, Np)/2)
+    J = np.diag(offDiag, 1) + np.diag(offDiag, -1)
+    points, vectors = np.linalg.eigh(J)
+    weights = np.sqrt(np.pi)*vectors[0]**2
+    return (points, weights)
+
+# Returns the Gauss-Hermite rule with Np points, loading or generating it only on first use
+# Inputs
+#	Np: number of integration points
+# Returns
+#	points: the integration points
+#	weights: the weights of the points for the weight function exp(-x^2)
+def hermiteRule(Np):
+    if (Np not in hermiteRules):
+        NpString = str(Np) if Np>=10 else "0" + str(Np)
+        path = os.path.join(dataFolder, "HermiteXW" + NpString + ".dat")
+        rule = packedRule("hermite", Np)
+        if (rule is not None):
+            hermiteRules[Np] = rule
+        elif (os.path.exists(path)):
+            data = np.loadtxt(path, usecols=(0, 1), ndmin=2)
+            hermiteRules[Np] = (data[:, 0], data[:, 1])
+        else:
+            hermiteRules[Np] = golubWelsch(Np)
+    return hermiteRules[Np]
+
+# Evaluates f at every point, in one call for vectorized integrands and point by point otherwise
+# Inputs
+#	f: function to evaluate
+#	points: array of points
+# Returns
+#	values: array of function values
+def evaluatePoints(f, points):
+    try:
+        values = np.asarray(f(points), dtype=float)
+        if (values.shape == points.shape):
+            return values
+    except (TypeError, ValueError):
+        pass
+    return np.array([f(x) for x in points], dtype=float)
+
+# Process-pool counterpart of evaluatePoints, batched as in evaluateNodesParallel of Simpson's_Methods.py
+# Inputs
+#	f: top-level function to evaluate
+#	points: array of points
+#	workers: number of processes (defaults to all cores, replaced by the size of executor when one is given)
+#	batchSize: number of points per task (defaults to about four tasks per worker)
+#	executor: existing pool to reuse across calls
+# Returns
+#	values: array of function values, in the same order as evaluatePoints
+def evaluatePointsParallel(f, points, workers=None, batchSize=None, executor=None):
+    if (executor is not None):
+        workers = executor._max_workers
+    elif (workers is None):
+        workers = os.cpu_count()
+    points = np.asarray(points)
+    if (batchSize is None):
+        batchSize = max(1, -(-points.size//(4*workers)))
+    batches = [points[start:start + batchSize] for start in range(0, points.size, batchSize)]
+
+    if (executor is not None):
+        values = list(executor.map(evaluatePoints, [f]*len(batches), batches))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            values = list(pool.map(evaluatePoints, [f]*len(batches), batches))
+
+    return np.concatenate(values)
+
 # Calculates the integral of f using Gaussian quadrature
 # Inputs
 #	f: function to be integrated
 #	Np: number of integration points
+#	workers: number of processes evaluating f, 1 to evaluate in this process
+#	batchSize: number of points sent to a worker per task
+#	executor: existing pool to evaluate f in, reused across calls (overrides workers)
 # Returns
 #	Integral: approximation of the integral
-def gaussHermiteInt(f,Np):
+def gaussHermiteInt(f,Np,workers=1,batchSize=None,executor=None):
 
-    NpString = str(Np) if Np>=10 else "0" + str(Np)
+    points, weights = hermiteRule(Np)
 
-    # Data provided in separate files
-    file = open("GaussHermiteData/HermiteXW" + NpString + ".dat", "r")
-    lines = file.readlines()
-    file.close()
-    
-    points = []
-    weights = []
-    for line in lines:
-        split = line.split()
-        points.append(float(split[0]))
-        weights.append(float(split[1]))
-        
-    Integral = 0.0
-    
-    for i in range(len(points)):
-        Integral += f(points[i])*weights[i]
+    # The weighted sum is formed here in the same order either way, so both paths agree exactly
+    if (workers == 1 and executor is None):
+        values = evaluatePoints(f, points)
+    else:
+        values = evaluatePointsParallel(f, points, workers, batchSize, executor)
+
+    Integral = np.dot(weights, values)
     
     return Integral
 
+# Calculates the integrals of a family of functions f(x, p) over many parameter values at once
+# Inputs
+#	f: function to be integrated, taking broadcastable arrays of points x and parameters p
+#	params: array of parameter values
+#	Np: number of integration points
+#	chunkSize: bound on the number of (parameter, point) pairs evaluated at a time
+# Returns
+#	Integrals: array of approximations of the integral, with the same shape as params
+def gaussHermiteIntBatch(f, params, Np, chunkSize=1048576):
+
+    points, weights = hermiteRule(Np)
+    params = np.asarray(params)
+    flat = params.ravel()
+    Integrals = np.empty(flat.size)
+
+    # Each chunk evaluates f on the (parameters x points) grid in one call
+    rows = max(1, chunkSize//Np)
+    for start in range(0, flat.size, rows):
+        p = flat[start:start + rows]
+        values = np.broadcast_to(f(points[None, :], p[:, None]), (p.size, Np))
+        Integrals[start:start + p.size] = np.dot(values, weights)
+
+    return Integrals.reshape(params.shape)
+
+# Gets the estimates of a family of functions f(x, p) at multiple points for many parameter values
+# Inputs
+#	f: function to be integrated, taking broadcastable arrays of points x and parameters p
+#	params: array of parameter values
+#	points: points to evaluate at
+# Returns
+#	estimates: array of approximations, estimates[i, j] for params[i] and points[j]
+def getEstimatesBatch(f, params, points):
+    return np.column_stack([gaussHermiteIntBatch(f, params, Np) for Np in points])
+
 # Gets the estimates of f at multiple points
 # Inputs
 #	f: function to be integrated
@@ -44,6 +240,14 @@ def getEstimates(f, points):
         estimates.append(gaussHermiteInt(f, i))
     return estimates
 
+# Example of an integrand that needs an iterative solve per point: the root E of Kepler's
+# equation E - sin(E)/2 = x, found by Newton's method
+def keplerIntegrand(x):
+    E = x
+    for k in range(50):
+        E = E - (E - np.sin(E)/2 - x)/(1 - np.cos(E)/2)
+    return np.cos(E)
+
 def main():
     
     # Example function
@@ -59,12 +263,33 @@ def main():
     plt.xlabel("# of Points")
     plt.ylabel("Estimate")
     
+    # The same example function with k as a second argument, so all k are integrated together
+    def fk(x, k):
+        return np.sin(k*x)**2
+
+    ks = 6 + .2*np.arange(5)
+    estimates = getEstimatesBatch(fk, ks, points)
     for i in range(0, 5):
-        k = 6 + .2*i
-        estimates = getEstimates(f(k), points)
-        plt.plot(points, estimates, c=colors[i], label='k = ' + str(k))
+        plt.plot(points, estimates[i], c=colors[i], label='k = ' + str(ks[i]))
     
     plt.legend(bbox_to_anchor=(1.05, 1), loc=2, borderaxespad=0.)
     plt.show()
 
-main()
\ No newline at end of file
+    # Rules without a data file are generated in process
+    print("Estimate with 200 points for k = 6: " + str(gaussHermiteInt(f(6), 200)))
+
+    # Sweep of many parameter values in one call
+    sweep = gaussHermiteIntBatch(fk, np.linspace(0, 10, 10000), 50, chunkSize=100000)
+    print("Estimates with 50 points for 10000 values of k, from " + str(sweep.min()) + " to " + str(sweep.max()))
+
+    # Expensive integrand evaluated across a process pool, shared by several rules
+    serial = gaussHermiteInt(keplerIntegrand, 50)
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        parallel = gaussHermiteInt(keplerIntegrand, 50, executor=pool)
+        print("Serial: " + str(serial) + "\nParallel: " + str(parallel) + "\nIdentical: " + str(serial == parallel))
+        for Np in [100, 200]:
+            print("Estimate with " + str(Np) + " points: " + str(gaussHermiteInt(keplerIntegrand, Np, executor=pool)))
+
+# Guarded so pool workers can import this file without rerunning the demo
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,5 +1,8 @@
 # Approximation of integrals using Simpson's methods
 
+import os
+import heapq
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -32,31 +35,230 @@ def trapezoidInt(a,b,f,Np,method):
     
     return Integral
 
+# Node offsets (in steps of h from a) and weights of the interior terms of trapezoidInt
+# Built per call: the offsets are as large as the node array, so caching them would pin that memory
+# Inputs
+#	Np: number of integration points in the approximation
+#	method: trapezoidal = 0, Simpson's 1/3 = 1, Simpson's 3/8 = 2
+# Returns
+#	offsets: Np x k array of node positions, so the nodes of step i are a + offsets[i]*h
+#	weights: weight of each of the k nodes in a step, before the overall factor of the method
+def ruleWeights(Np, method):
+    i = np.arange(1, Np + 1)
+
+    if (method == 0):
+        return (np.column_stack((i,)).astype(float), np.array([2.0]))
+    if (method == 1):
+        return (np.column_stack((i - .5, i)), np.array([4.0, 2.0]))
+    return (np.column_stack((i - (2/3), i - (1/3), i)), np.array([3.0, 3.0, 2.0]))
+
+# Evaluates f at every node, in one call for vectorized integrands
+# Scalar-only integrands (those that fail on arrays) are evaluated point by point in chunks
+# Inputs
+#	f: function to evaluate
+#	x: array of nodes
+#	chunkSize: number of nodes evaluated per chunk in the scalar fallback
+# Returns
+#	fx: array of function values
+def evaluateNodes(f, x, chunkSize=65536):
+    try:
+        fx = np.asarray(f(x), dtype=float)
+        if (fx.shape == x.shape):
+            return fx
+    except (TypeError, ValueError):
+        pass
+
+    fx = np.empty(x.size)
+    for start in range(0, x.size, chunkSize):
+        chunk = x[start:start + chunkSize]
+        fx[start:start + chunk.size] = np.fromiter((f(xi) for xi in chunk), float, chunk.size)
+    return fx
+
+# Evaluates f at every node across a pool of processes, in batches to amortize communication
+# Batches come back in order, so the values are identical to those of evaluateNodes
+# Inputs
+#	f: function to evaluate, defined at the top level of a module so it can be sent to the workers
+#	x: array of nodes
+#	workers: number of processes (defaults to all cores, replaced by the size of executor when one is given)
+#	batchSize: number of nodes sent to a worker per task (defaults to about four tasks per worker)
+#	executor: existing pool to reuse across calls, instead of starting one for this call
+# Returns
+#	fx: array of function values
+def evaluateNodesParallel(f, x, workers=None, batchSize=None, executor=None):
+    if (executor is not None):
+        workers = executor._max_workers
+    elif (workers is None):
+        workers = os.cpu_count()
+    if (batchSize is None):
+        batchSize = max(1, -(-x.size//(4*workers)))
+    batches = [x[start:start + batchSize] for start in range(0, x.size, batchSize)]
+
+    if (executor is not None):
+        values = list(executor.map(evaluateNodes, [f]*len(batches), batches))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            values = list(pool.map(evaluateNodes, [f]*len(batches), batches))
+
+    return np.concatenate(values)
+
+# Calculates the integral of f between a and b using Simpson's methods, evaluating f on all nodes at once
+# Uses the same nodes as trapezoidInt, combined with precomputed weight vectors
+# Inputs
+#	a: lower limit of integration
+#	b: upper limit of integration
+#	f: function to integrate, ideally accepting an array of points
+#	Np: number of integration points in the approximation
+#	method: trapezoidal = 0, Simpson's 1/3 = 1, Simpson's 3/8 = 2
+#	chunkSize: number of nodes evaluated per chunk for scalar-only integrands
+#	workers: number of processes evaluating f, 1 to evaluate in this process
+#	batchSize: number of nodes sent to a worker per task
+#	executor: existing pool to evaluate f in, reused across calls (overrides workers)
+# Returns
+#	Integral: approximate value of the integral
+def trapezoidIntVec(a,b,f,Np,method,chunkSize=65536,workers=1,batchSize=None,executor=None):
+
+    h = (b - a)/Np
+    offsets, weights = ruleWeights(Np, method)
+
+    x = np.concatenate(([a, b], (a + offsets*h).ravel()))
+    if (workers == 1 and executor is None):
+        fx = evaluateNodes(f, x, chunkSize)
+    else:
+        fx = evaluateNodesParallel(f, x, workers, batchSize, executor)
+
+    # Weighted terms of each step, summed in the same order as trapezoidInt so the result matches it exactly
+    fsteps = fx[2:].reshape(offsets.shape)*weights
+    terms = fsteps[:, 0]
+    for k in range(1, weights.size):
+        terms = terms + fsteps[:, k]
+    Integral = np.add.accumulate(np.concatenate(([fx[0] - fx[1]], terms)))[-1]
+
+    if (method == 0):
+        Integral *= h/2
+    if (method == 1):
+        Integral *= h/3
+    if (method == 2):
+        Integral *= 3*h/8
+
+    return Integral
+
+# Calculates the integral of f between a and b using Romberg integration
+# Each level halves the step and evaluates f only at the new midpoints, then Richardson extrapolation
+# is applied across the levels of the table
+# Inputs
+#	a: lower limit of integration
+#	b: upper limit of integration
+#	f: function to integrate
+#	tol: tolerance of the difference between successive extrapolated estimates
+#	maxLevels: maximum number of step halvings
+# Returns
+#	Integral: approximate value of the integral
+#	evaluations: number of evaluations of f used
+def rombergInt(a, b, f, tol, maxLevels=20):
+
+    h = b - a
+    fends = evaluateNodes(f, np.array([a, b]))
+    evaluations = 2
+    R = [[h*(fends[0] + fends[1])/2]]
+
+    for k in range(1, maxLevels + 1):
+        h /= 2
+        mids = a + h*np.arange(1, 2**k, 2)
+        evaluations += mids.size
+
+        # Trapezoidal estimate on the halved step, reusing the previous estimate
+        row = [R[k - 1][0]/2 + h*np.sum(evaluateNodes(f, mids))]
+        for j in range(1, k + 1):
+            row.append(row[j - 1] + (row[j - 1] - R[k - 1][j - 1])/(4**j - 1))
+        R.append(row)
+
+        if (np.abs(R[k][k] - R[k - 1][k - 1]) <= tol):
+            break
+
+    return (R[-1][-1], evaluations)
+
+# Calculates the integral of f between a and b using globally adaptive Simpson's 1/3 rule
+# The interval with the largest error estimate is always refined first; f is memoized by abscissa
+# so shared endpoints and midpoints are evaluated only once
+# Inputs
+#	a: lower limit of integration
+#	b: upper limit of integration
+#	f: function to integrate
+#	tol: tolerance of the total error estimate
+#	maxEvaluations: budget of evaluations of f
+# Returns
+#	Integral: approximate value of the integral
+#	evaluations: number of evaluations of f used
+def adaptiveSimpsonInt(a, b, f, tol, maxEvaluations=10000):
+
+    values = {}
+    def fmemo(x):
+        if (x not in values):
+            values[x] = f(x)
+        return values[x]
+
+    # Simpson's rule on [lo, hi] and on both halves; the difference estimates the error
+    def interval(lo, hi):
+        mid = (lo + hi)/2
+        h = hi - lo
+        whole = h/6*(fmemo(lo) + 4*fmemo(mid) + fmemo(hi))
+        halves = h/12*(fmemo(lo) + 4*fmemo((lo + mid)/2) + 2*fmemo(mid) + 4*fmemo((mid + hi)/2) + fmemo(hi))
+        error = np.abs(halves - whole)/15
+        return (-error, lo, hi, halves + (halves - whole)/15)
+
+    queue = [interval(a, b)]
+    totalError = -queue[0][0]
+
+    while (totalError > tol and len(values) + 4 <= maxEvaluations):
+        negError, lo, hi, estimate = heapq.heappop(queue)
+        mid = (lo + hi)/2
+        left = interval(lo, mid)
+        right = interval(mid, hi)
+        heapq.heappush(queue, left)
+        heapq.heappush(queue, right)
+        totalError += negError - left[0] - right[0]
+
+    Integral = sum(item[3] for item in queue)
+
+    return (Integral, len(values))
+
 # Gets the relative error between different resolutions of approximation
-def getError(a, b, f, points, method):
+def getError(a, b, f, points, method, integrator=trapezoidInt):
     approx = []
     error = []
     leftBoundPts = 10
-    approx.append(trapezoidInt(a, b, f, leftBoundPts, method))
+    approx.append(integrator(a, b, f, leftBoundPts, method))
     
     for i in range(len(points)):
-        approx.append(trapezoidInt(a, b, f, points[i], method))
+        approx.append(integrator(a, b, f, points[i], method))
         error.append(np.abs(approx[i + 1] - approx[i]))
         
     return error
 
+# Example of an expensive integrand, such as one wrapping a simulation
+def slowIntegrand(x):
+    total = 0.0
+    for k in range(1, 200):
+        total += np.cos(k*x)/k**2
+    return total
+
 def main():
     
     # Example function
     def f(x):
         return np.log(1 + x)/x if x != 0 else 1
+
+    # The same function written for arrays of points
+    def fvec(x):
+        safe = np.where(x != 0, x, 1)
+        return np.where(x != 0, np.log(1 + safe)/safe, 1)
     
     points = [100, 1000, 10000, 100000]
     
-    # Get errors for each method
-    errorT = getError(0, 1, f, points, 0)
-    errorS1 = getError(0, 1, f, points, 1)
-    errorS2 = getError(0, 1, f, points, 2)
+    # Get errors for each method, evaluating the integrand on all nodes at once
+    errorT = getError(0, 1, fvec, points, 0, trapezoidIntVec)
+    errorS1 = getError(0, 1, fvec, points, 1, trapezoidIntVec)
+    errorS2 = getError(0, 1, fvec, points, 2, trapezoidIntVec)
     
     # Determine slopes of error plots (convergence rate)
     slopeT = np.polyfit(np.log(points), np.log(errorT), 1)[0]
@@ -75,5 +277,38 @@ def main():
     plt.scatter(np.log(points), np.log(errorS2), c='b', label='Simpson\'s 3/8')
     plt.legend(bbox_to_anchor=(1.05, 1), loc=2, borderaxespad=0.)
     plt.show()
-    
-main()
\ No newline at end of file
+
+    # Scalar-only integrands fall back to chunked point-by-point evaluation
+    print("Trapezoidal with Np=1000, loop: " + str(trapezoidInt(0, 1, f, 1000, 0)))
+    print("Trapezoidal with Np=1000, vectorized: " + str(trapezoidIntVec(0, 1, fvec, 1000, 0)))
+    print("Trapezoidal with Np=1000, scalar fallback: " + str(trapezoidIntVec(0, 1, f, 1000, 0)))
+
+    # Romberg integration reaches the same accuracy with far fewer evaluations
+    IntegralR, evaluationsR = rombergInt(0, 1, fvec, 1e-12)
+    print("Romberg: " + str(IntegralR) + " using " + str(evaluationsR) + " evaluations")
+
+    # Adaptive Simpson's rule places its points where the local error is largest
+    IntegralA, evaluationsA = adaptiveSimpsonInt(0, 1, f, 1e-12)
+    print("Adaptive Simpson: " + str(IntegralA) + " using " + str(evaluationsA) + " evaluations")
+
+    # A sharp peak at x = 0.3 that uniform spacing resolves poorly
+    def peak(x):
+        return 1/(1e-4 + (x - 0.3)**2)
+    exact = 100*(np.arctan(70) + np.arctan(30))
+    IntegralP, evaluationsP = adaptiveSimpsonInt(0, 1, peak, 1e-8)
+    print("Adaptive Simpson error for sharp peak: " + str(np.abs(IntegralP - exact)) + " using " + str(evaluationsP) + " evaluations")
+    print("Trapezoidal error for sharp peak: " + str(np.abs(trapezoidIntVec(0, 1, peak, evaluationsP, 0) - exact)) + " using " + str(evaluationsP + 1) + " evaluations")
+
+    # Expensive integrand evaluated across a process pool, combined in the same order as the serial path
+    serial = trapezoidInt(0, 1, slowIntegrand, 2000, 2)
+    parallel = trapezoidIntVec(0, 1, slowIntegrand, 2000, 2, workers=4)
+    print("Serial: " + str(serial) + "\nParallel: " + str(parallel) + "\nIdentical: " + str(serial == parallel))
+
+    # One pool shared by several integrations, so the workers are started only once
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        for Np in [500, 1000, 2000]:
+            print("Np=" + str(Np) + " with a shared pool: " + str(trapezoidIntVec(0, 1, slowIntegrand, Np, 2, executor=pool)))
+
+# Guarded so pool workers can import this file without rerunning the demo
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,8 +1,6 @@
 # One-dimensional interpolation using splines and Lagrange polynomials
 
 import numpy as np
-import scipy as sp
-from scipy import interpolate as spi
 import matplotlib.pyplot as plt
 
 # Returns i-th Lagrange function evaulated at x using n support points given in xsup
@@ -38,6 +36,192 @@ def LagrangePoly(x,xsup,ysup,n):
     
     return y
 
+# Lagrange interpolating polynomial in barycentric form, with weights computed once
+# Inputs
+#	xsup: the support points used for interpolation
+#	ysup: the function evaluated at the points in xsup
+#	chunkSize: number of query points evaluated at a time, bounding memory to chunkSize x n
+class BarycentricInterpolant:
+
+    def __init__(self, xsup, ysup, chunkSize=65536):
+        self.xsup = np.asarray(xsup, dtype=float)
+        self.ysup = np.asarray(ysup, dtype=float)
+        self.chunkSize = chunkSize
+
+        # w_j = 1/prod_{k != j}(x_j - x_k), formed from log-magnitudes and a sign so the products
+        # cannot overflow or underflow; the stored weights are w_j*exp(logScale), and the common
+        # factor cancels in evaluation
+        diff = self.xsup[:, None] - self.xsup[None, :]
+        np.fill_diagonal(diff, 1)
+        logw = -np.sum(np.log(np.abs(diff)), axis=1)
+        sign = np.prod(np.sign(diff), axis=1)
+        self.logScale = -np.max(logw) if logw.size > 0 else 0.0
+        self.weights = sign*np.exp(logw + self.logScale)
+
+    # Evaluates the interpolation at x
+    # Inputs
+    #	x: the point or array of points at which to evaluate the function
+    # Returns
+    #	y: the value of the interpolation at x, with the same shape as x
+    def __call__(self, x):
+        x = np.asarray(x, dtype=float)
+        xflat = x.ravel()
+        y = np.empty(xflat.size)
+
+        for start in range(0, xflat.size, self.chunkSize):
+            xc = xflat[start:start + self.chunkSize]
+            diff = xc[:, None] - self.xsup[None, :]
+
+            # Query points on a support point take its value directly
+            exact = (diff == 0)
+            diff[exact] = 1
+            terms = self.weights/diff
+            y[start:start + xc.size] = np.dot(terms, self.ysup)/np.sum(terms, axis=1)
+            rows, cols = np.nonzero(exact)
+            y[start + rows] = self.ysup[cols]
+
+        return y.reshape(x.shape)
+
+    # Adds a support point, updating the existing weights in O(n) instead of recomputing them
+    # Inputs
+    #	x: the new support point
+    #	y: the function evaluated at x
+    def addPoint(self, x, y):
+        if (np.any(self.xsup == x)):
+            raise ValueError("Error: repeated support point")
+
+        # Update at the current scale, then rescale so the largest weight has magnitude 1
+        diff = x - self.xsup
+        wNew = np.prod(np.sign(diff))*np.exp(self.logScale - np.sum(np.log(np.abs(diff))))
+        self.weights = np.append(-self.weights/diff, wNew)
+        wMax = np.max(np.abs(self.weights))
+        self.weights /= wMax
+        self.logScale -= np.log(wMax)
+        self.xsup = np.append(self.xsup, x)
+        self.ysup = np.append(self.ysup, y)
+
+# Solves a tridiagonal system using the Thomas algorithm
+# Inputs
+#	a: sub-diagonal, a[i] = M[i + 1, i]
+#	b: main diagonal
+#	c: super-diagonal, c[i] = M[i, i + 1]
+#	d: product vector
+# Returns
+#	x: the solution vector
+def thomas(a, b, c, d):
+    n = len(b)
+    cp = np.zeros(n)
+    x = np.array(d, dtype=float)
+
+    cp[0] = c[0]/b[0] if n > 1 else 0
+    x[0] /= b[0]
+    for i in range(1, n):
+        denom = b[i] - a[i - 1]*cp[i - 1]
+        if (i < n - 1):
+            cp[i] = c[i]/denom
+        x[i] = (x[i] - a[i - 1]*x[i - 1])/denom
+
+    for i in range(n - 2, -1, -1):
+        x[i] -= cp[i]*x[i + 1]
+
+    return x
+
+# Cubic spline through the support points, with per-interval coefficients computed once
+# Inputs
+#	xsup: the support points used for interpolation, in increasing order
+#	ysup: the function evaluated at the points in xsup
+#	bc: end condition, 'natural', 'clamped' or 'not-a-knot'
+#	endSlopes: first derivatives at both ends, used by the clamped end condition
+class CubicSpline:
+
+    def __init__(self, xsup, ysup, bc='not-a-knot', endSlopes=(0, 0)):
+        if (bc not in ('natural', 'clamped', 'not-a-knot')):
+            raise ValueError("Error: unknown end condition " + repr(bc))
+        x = np.asarray(xsup, dtype=float)
+        y = np.asarray(ysup, dtype=float)
+        n = x.size
+        h = np.diff(x)
+        slope = np.diff(y)/h
+
+        # Second derivatives m at the support points from the tridiagonal continuity equations
+        # h[i-1]*m[i-1] + 2*(h[i-1] + h[i])*m[i] + h[i]*m[i+1] = 6*(slope[i] - slope[i-1])
+        m = np.zeros(n)
+        if (n == 3 and bc == 'not-a-knot'):
+            m[:] = 2*(slope[1] - slope[0])/(h[0] + h[1])
+        elif (n > 2 and bc == 'not-a-knot'):
+            # Third derivative continuous at x[1] and x[n-2]; eliminate m[0] and m[n-1]
+            sub = np.copy(h[1:-1])
+            diag = 2*(h[:-1] + h[1:])
+            sup = np.copy(h[1:-1])
+            rhs = 6*np.diff(slope)
+            diag[0] += h[0]*(h[0] + h[1])/h[1]
+            sup[0] -= h[0]**2/h[1]
+            diag[-1] += h[-1]*(h[-1] + h[-2])/h[-2]
+            sub[-1] -= h[-1]**2/h[-2]
+            m[1:-1] = thomas(sub, diag, sup, rhs)
+            m[0] = ((h[0] + h[1])*m[1] - h[0]*m[2])/h[1]
+            m[-1] = ((h[-1] + h[-2])*m[-2] - h[-1]*m[-3])/h[-2]
+        elif (bc == 'clamped'):
+            sub = np.copy(h)
+            diag = np.concatenate(([2*h[0]], 2*(h[:-1] + h[1:]), [2*h[-1]]))
+            sup = np.copy(h)
+            rhs = 6*np.concatenate(([slope[0] - endSlopes[0]], np.diff(slope), [endSlopes[1] - slope[-1]]))
+            m = thomas(sub, diag, sup, rhs)
+        elif (n > 2):
+            m[1:-1] = thomas(h[1:-1], 2*(h[:-1] + h[1:]), h[1:-1], 6*np.diff(slope))
+
+        # y = c0 + c1*t + c2*t^2 + c3*t^3 with t = x - xsup[i] on interval i
+        self.xsup = x
+        self.coefs = np.array([y[:-1],
+                               slope - h*(2*m[:-1] + m[1:])/6,
+                               m[:-1]/2,
+                               np.diff(m)/(6*h)])
+
+        # Integral from xsup[0] to the start of each interval
+        c0, c1, c2, c3 = self.coefs
+        self.cumInt = np.concatenate(([0], np.cumsum(h*(c0 + h*(c1/2 + h*(c2/3 + h*c3/4))))))
+
+    # Finds the interval of each point and the offset from its left support point
+    def locate(self, x):
+        x = np.asarray(x, dtype=float)
+        i = np.clip(np.searchsorted(self.xsup, x, side='right') - 1, 0, self.xsup.size - 2)
+        return (i, x - self.xsup[i])
+
+    # Evaluates the spline or one of its derivatives at x
+    # Inputs
+    #	x: the point or array of points at which to evaluate the spline
+    #	nu: order of the derivative, zero for orders above 3
+    # Returns
+    #	y: the value of the spline (or derivative) at x, with the same shape as x
+    def __call__(self, x, nu=0):
+        i, t = self.locate(x)
+        c0, c1, c2, c3 = self.coefs[:, i]
+
+        if (nu == 0):
+            return c0 + t*(c1 + t*(c2 + t*c3))
+        if (nu == 1):
+            return c1 + t*(2*c2 + t*3*c3)
+        if (nu == 2):
+            return 2*c2 + 6*t*c3
+        if (nu == 3):
+            return 6*c3
+        return np.zeros_like(t)
+
+    # Integrates the spline from a to b
+    # Inputs
+    #	a: lower limit of integration
+    #	b: upper limit of integration
+    # Returns
+    #	Integral: value of the integral
+    def integrate(self, a, b):
+        return self.antiderivative(b) - self.antiderivative(a)
+
+    # Evaluates the integral of the spline from xsup[0] to x
+    def antiderivative(self, x):
+        i, t = self.locate(x)
+        c0, c1, c2, c3 = self.coefs[:, i]
+        return self.cumInt[i] + t*(c0 + t*(c1/2 + t*(c2/3 + t*c3/4)))
+
 # Example function
 def fx(x):
     return np.abs(np.sin(x))
@@ -79,9 +263,9 @@ def main():
         yarr = fx(xarr)
     
     	# The interpolation result using Lagrange polynomials of degree n
-        ypolL = LagrangePoly(xarr, xpos, ypos, n)
+        ypolL = BarycentricInterpolant(xpos, ypos)(xarr)
         if (n > 3):
-            ypolS = spi.interp1d(xpos, ypos, kind = 'cubic')(xarr)  # The interpolation result using cubic Splines
+            ypolS = CubicSpline(xpos, ypos)(xarr)  # The interpolation result using cubic Splines
 
         # The RMSE for each interpolation
         rmseL = np.sqrt(sum((ypolL - yarr)**2)/len(yarr))
@@ -113,5 +297,24 @@ def main():
     print("%-*s%-*s%-*s" % (20, 'Support Points', 20, 'Polynomial RMSE', 20, 'Spline RMSE'))
     for i in range(len(nsup)):
         print("%-*s%-*s%-*s" % (20, nsup[i], 20, rmseLL[i], 20, rmseSL[i]))
+
+    # Support points arriving one at a time, in no particular order
+    stream = BarycentricInterpolant([], [])
+    for x in np.random.permutation(np.linspace(xmin, xmax, 9)):
+        stream.addPoint(x, fx(x))
+    batch = BarycentricInterpolant(np.linspace(xmin, xmax, 9), fx(np.linspace(xmin, xmax, 9)))
+    print("\nMax difference between streamed and batch interpolants: " + str(np.max(np.abs(stream(xarr) - batch(xarr)))))
+
+    # Several hundred Chebyshev support points on a wide interval
+    xcheb = 500 + 500*np.cos(np.pi*(np.arange(400) + 0.5)/400)
+    cheb = BarycentricInterpolant(xcheb, np.sin(xcheb/50))
+    xwide = np.linspace(0, 1000, 10000)
+    print("Max error with 400 Chebyshev points on [0, 1000]: " + str(np.max(np.abs(cheb(xwide) - np.sin(xwide/50)))))
+
+    # The same points added one at a time
+    chebStream = BarycentricInterpolant([], [])
+    for xk in np.random.permutation(xcheb):
+        chebStream.addPoint(xk, np.sin(xk/50))
+    print("Max difference when streamed: " + str(np.max(np.abs(chebStream(xwide) - cheb(xwide)))))
         
 main()
\ No newline at end of file
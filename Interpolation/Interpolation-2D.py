@@ -1,5 +1,8 @@
 # Two-dimensional interpolation using nearest-neighbor and bilinear interpolation
 
+import os
+import tempfile
+from collections import OrderedDict
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -51,6 +54,180 @@ def interpol2d(xarr,yarr,fmap,xpos,ypos,iord):
   
     return(fint)
 
+# Finds the support cell containing each position
+# Inputs
+#	arr: sorted support points along one axis
+#	pos: positions along the same axis, in any order
+# Returns
+#	idx: index of the left support point of each cell
+#	lDist: distance from the left support point
+#	rDist: distance to the right support point
+def cellIndex(arr, pos):
+    arr = np.asarray(arr, dtype=float)
+    pos = np.asarray(pos, dtype=float)
+    idx = np.clip(np.searchsorted(arr, pos) - 1, 0, arr.size - 2)
+    return (idx, pos - arr[idx], arr[idx + 1] - pos)
+
+# Evaluates nearest-neighbor or bilinear interpolation for broadcastable arrays of cells
+# Inputs
+#	fmap: 2D array of values of f at all pairs of support points
+#	xi, lDist, rDist: cell indices and distances along x, as returned by cellIndex
+#	yi, tDist, bDist: cell indices and distances along y, as returned by cellIndex
+#	iord: 0: nearest-neighbor, 1: bilinear interpolation
+# Returns
+#	fint: array of interpolated function values, with the broadcast shape of the inputs
+def interpKernel(fmap, xi, lDist, rDist, yi, tDist, bDist, iord):
+    if (iord == 0):
+        xint = np.where(lDist < rDist, xi, xi + 1)
+        yint = np.where(tDist < bDist, yi, yi + 1)
+        return fmap[xint, yint]
+
+    xint1 = (rDist*fmap[xi, yi] + lDist*fmap[xi + 1, yi])/(lDist + rDist)
+    xint2 = (rDist*fmap[xi, yi + 1] + lDist*fmap[xi + 1, yi + 1])/(lDist + rDist)
+    return (bDist*xint1 + tDist*xint2)/(tDist + bDist)
+
+# Performs 2D interpolation on the grid of all pairs of (xpos, ypos) in one broadcasted pass
+# Inputs
+#	xarr: x support points
+#	yarr: y support points
+#	fmap: values of f at all pairs of (xarr, yarr)
+#	xpos: x positions to evaluate interpolation, in any order
+#	ypos: y positions to evaluate interpolation, in any order
+#	iord: 0: nearest-neighbor, 1: bilinear interpolation
+# Returns
+#	fint: 2D array of interpolated function values, fint[i, j] at (xpos[i], ypos[j])
+def interpol2dGrid(xarr,yarr,fmap,xpos,ypos,iord):
+
+    fmap = np.asarray(fmap, dtype=float)
+    xi, lDist, rDist = cellIndex(xarr, xpos)
+    yi, tDist, bDist = cellIndex(yarr, ypos)
+
+    return interpKernel(fmap, xi[:, None], lDist[:, None], rDist[:, None],
+                        yi[None, :], tDist[None, :], bDist[None, :], iord)
+
+# Splits paired coordinate arrays into chunks
+# Inputs
+#	xpos: x coordinates of the query points
+#	ypos: y coordinates of the query points, paired with xpos
+#	chunkSize: number of points per chunk
+# Returns
+#	generator of (x, y) chunks
+def chunkPoints(xpos, ypos, chunkSize):
+    for start in range(0, len(xpos), chunkSize):
+        yield (xpos[start:start + chunkSize], ypos[start:start + chunkSize])
+
+# Performs 2D interpolation at scattered (x, y) points, one chunk at a time
+# Inputs
+#	xarr: x support points
+#	yarr: y support points
+#	fmap: values of f at all pairs of (xarr, yarr)
+#	chunks: iterable of (x, y) pairs of equal-length coordinate arrays
+#	iord: 0: nearest-neighbor, 1: bilinear interpolation
+# Returns
+#	generator of arrays of interpolated function values, one per chunk
+def interpol2dStream(xarr,yarr,fmap,chunks,iord):
+
+    fmap = np.asarray(fmap, dtype=float)
+
+    for (x, y) in chunks:
+        xi, lDist, rDist = cellIndex(xarr, x)
+        yi, tDist, bDist = cellIndex(yarr, y)
+        yield interpKernel(fmap, xi, lDist, rDist, yi, tDist, bDist, iord)
+
+# Performs 2D interpolation at scattered (x, y) points
+# Inputs
+#	xarr: x support points
+#	yarr: y support points
+#	fmap: values of f at all pairs of (xarr, yarr)
+#	xpos: x coordinates of the query points
+#	ypos: y coordinates of the query points, paired with xpos
+#	iord: 0: nearest-neighbor, 1: bilinear interpolation
+#	chunkSize: number of points interpolated at a time, bounding temporary memory
+# Returns
+#	fint: 1D array of interpolated function values, fint[i] at (xpos[i], ypos[i])
+def interpol2dPoints(xarr,yarr,fmap,xpos,ypos,iord,chunkSize=1048576):
+
+    fint = np.empty(len(xpos))
+    start = 0
+    for values in interpol2dStream(xarr, yarr, fmap, chunkPoints(xpos, ypos, chunkSize), iord):
+        fint[start:start + values.size] = values
+        start += values.size
+
+    return fint
+
+# Least-recently-used cache of square tiles of a large grid, such as an np.memmap
+# Tiles overlap their neighbors by one row and column so every cell lies inside a single tile
+# Inputs
+#	grid: 2D array of values of f at all pairs of support points
+#	tileSize: number of cells along each side of a tile
+#	maxTiles: number of tiles held in memory
+# Attributes
+#	hits, misses: counters of tile lookups
+class TileCache:
+
+    def __init__(self, grid, tileSize=512, maxTiles=64):
+        self.grid = grid
+        self.tileSize = tileSize
+        self.maxTiles = maxTiles
+        self.tiles = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # Returns the tile starting at cell (tx*tileSize, ty*tileSize), reading it from the grid on a miss
+    def tile(self, tx, ty):
+        key = (tx, ty)
+        if (key in self.tiles):
+            self.hits += 1
+            self.tiles.move_to_end(key)
+            return self.tiles[key]
+
+        self.misses += 1
+        if (len(self.tiles) >= self.maxTiles):
+            self.tiles.popitem(last=False)
+        r0 = tx*self.tileSize
+        c0 = ty*self.tileSize
+        block = np.array(self.grid[r0:r0 + self.tileSize + 1, c0:c0 + self.tileSize + 1], dtype=float)
+        self.tiles[key] = block
+        return block
+
+    # Fraction of tile lookups served from memory
+    def hitRate(self):
+        total = self.hits + self.misses
+        return self.hits/total if total > 0 else 0.0
+
+# Performs 2D interpolation at scattered (x, y) points on a grid served through a tile cache
+# Queries are grouped by tile so each tile is fetched once per call
+# Inputs
+#	xarr: x support points
+#	yarr: y support points
+#	cache: TileCache over the values of f at all pairs of (xarr, yarr)
+#	xpos: x coordinates of the query points
+#	ypos: y coordinates of the query points, paired with xpos
+#	iord: 0: nearest-neighbor, 1: bilinear interpolation
+# Returns
+#	fint: 1D array of interpolated function values, fint[i] at (xpos[i], ypos[i])
+def interpol2dTiled(xarr,yarr,cache,xpos,ypos,iord):
+
+    T = cache.tileSize
+    xi, lDist, rDist = cellIndex(xarr, xpos)
+    yi, tDist, bDist = cellIndex(yarr, ypos)
+
+    tx = xi//T
+    ty = yi//T
+    key = tx*((len(yarr) - 2)//T + 1) + ty
+    order = np.argsort(key, kind='stable')
+    groups = np.split(order, np.flatnonzero(np.diff(key[order])) + 1)
+
+    fint = np.empty(len(xpos))
+    for g in groups:
+        if (g.size == 0):
+            continue
+        block = cache.tile(tx[g[0]], ty[g[0]])
+        fint[g] = interpKernel(block, xi[g] - tx[g[0]]*T, lDist[g], rDist[g],
+                               yi[g] - ty[g[0]]*T, tDist[g], bDist[g], iord)
+
+    return fint
+
 # Example function
 def ff(x, y):
     r = np.sqrt(x**2 + y**2)
@@ -81,17 +258,17 @@ def main():
     xpos[nrand - 1] = xmax
     ypos[0] = ymin
     ypos[nrand - 1] = ymax
-    fpos = [[ff(i, j) for j in ypos] for i in xpos]  # The n x n true function values, needed to calculate RMSE
+    fpos = ff(xpos[:, None], ypos[None, :])  # The n x n true function values, needed to calculate RMSE
 
     for n in nres:
 
         xarr = np.linspace(xmin, xmax, n) # Support points in x direction
         yarr = np.linspace(ymin, ymax, n) # Support points in y direction
-        fsup = [[ff(i, j) for j in yarr] for i in xarr] # Function evaluated at support points
+        fsup = ff(xarr[:, None], yarr[None, :]) # Function evaluated at support points
 
         # Call interpolation routines
-        fint1 = interpol2d(xarr, yarr, fsup, xpos, ypos, 0)  # The interpolated function values: 0 for nearest
-        fint2 = interpol2d(xarr, yarr, fsup, xpos, ypos, 1)  # The interpolated function values: 1 for linear
+        fint1 = interpol2dGrid(xarr, yarr, fsup, xpos, ypos, 0)  # The interpolated function values: 0 for nearest
+        fint2 = interpol2dGrid(xarr, yarr, fsup, xpos, ypos, 1)  # The interpolated function values: 1 for linear
 
         # Calculation of RMSEs
         rmse0 = 0
@@ -125,5 +302,32 @@ def main():
     
     print('Slope for nearest neighbor: ' + str(m0))
     print('Slope for bilinear interpolation: ' + str(m1))
+
+    # Scattered points, such as particle positions, on the finest grid
+    xp = (xmax - xmin)*np.random.rand(nrand*nrand) + xmin
+    yp = (ymax - ymin)*np.random.rand(nrand*nrand) + ymin
+    fp = interpol2dPoints(xarr, yarr, fsup, xp, yp, 1, chunkSize=1000)
+    print('RMSE at scattered points: ' + str(np.sqrt(np.mean((fp - ff(xp, yp))**2))))
+
+    # Large single-precision table on disk, sampled through a bounded tile cache
+    with tempfile.TemporaryDirectory() as folder:
+        n = 4000
+        xarr = np.linspace(xmin, xmax, n)
+        yarr = np.linspace(ymin, ymax, n)
+        table = np.memmap(os.path.join(folder, 'table.dat'), dtype=np.float32, mode='w+', shape=(n, n))
+        for r0 in range(0, n, 500):
+            table[r0:r0 + 500] = ff(xarr[r0:r0 + 500, None], yarr[None, :])
+        cache = TileCache(table, tileSize=256, maxTiles=16)
+        ft = interpol2dTiled(xarr, yarr, cache, xp, yp, 1)
+        print('RMSE from memory-mapped table: ' + str(np.sqrt(np.mean((ft - ff(xp, yp))**2))))
+
+        # Batches of queries clustered in one corner of the table reuse the cached tiles
+        cache = TileCache(table, tileSize=256, maxTiles=16)
+        for batch in range(10):
+            xb = 0.2*(xmax - xmin)*np.random.rand(nrand*nrand) + xmin
+            yb = 0.2*(ymax - ymin)*np.random.rand(nrand*nrand) + ymin
+            interpol2dTiled(xarr, yarr, cache, xb, yb, 1)
+        print('Tile cache hit rate for clustered batches: ' + str(cache.hitRate()))
+        del table, cache
     
 main()
\ No newline at end of file
@@ -0,0 +1,98 @@
+# N-dimensional interpolation on regular grids using nearest-neighbor and multilinear interpolation
+
+import numpy as np
+
+# Finds the support cell containing each position
+# Inputs
+#	arr: sorted support points along one axis
+#	pos: positions along the same axis, in any order
+# Returns
+#	idx: index of the left support point of each cell
+#	lDist: distance from the left support point
+#	rDist: distance to the right support point
+def cellIndex(arr, pos):
+    idx = np.clip(np.searchsorted(arr, pos) - 1, 0, arr.size - 2)
+    return (idx, pos - arr[idx], arr[idx + 1] - pos)
+
+# Interpolation of values given on the tensor-product grid of d support axes
+# Inputs
+#	axes: list of d sorted arrays of support points, one per dimension
+#	values: d-dimensional array, values[i1, ..., id] at (axes[0][i1], ..., axes[d-1][id])
+#	iord: 0: nearest-neighbor, 1: multilinear interpolation
+#	chunkSize: number of query points evaluated at a time, bounding memory to chunkSize x 2^d
+class RegularGridInterpolant:
+
+    def __init__(self, axes, values, iord=1, chunkSize=65536):
+        self.axes = [np.asarray(axis, dtype=float) for axis in axes]
+        self.flat = np.ascontiguousarray(values, dtype=float).ravel()
+        self.iord = iord
+        self.chunkSize = chunkSize
+
+        # Offset in the flat array of one step along each axis
+        shape = np.array([axis.size for axis in self.axes])
+        self.strides = np.append(np.cumprod(shape[:0:-1])[::-1], 1)
+
+        # Corners of a cell as 0/1 steps along each axis, and their flat offsets
+        d = len(self.axes)
+        self.corners = (np.arange(2**d)[:, None] >> np.arange(d - 1, -1, -1)) & 1
+        self.cornerOffsets = np.dot(self.corners, self.strides)
+
+    # Evaluates the interpolation at the query points
+    # Inputs
+    #	points: N x d array of query points
+    # Returns
+    #	fint: array of N interpolated function values
+    def __call__(self, points):
+        points = np.asarray(points, dtype=float)
+        fint = np.empty(points.shape[0])
+
+        for start in range(0, points.shape[0], self.chunkSize):
+            fint[start:start + self.chunkSize] = self.evaluate(points[start:start + self.chunkSize])
+
+        return fint
+
+    # Evaluates the interpolation for one chunk of query points
+    def evaluate(self, points):
+        d = len(self.axes)
+        idx = np.empty(points.shape, dtype=np.int64)
+        lDist = np.empty(points.shape)
+        rDist = np.empty(points.shape)
+        for k in range(d):
+            idx[:, k], lDist[:, k], rDist[:, k] = cellIndex(self.axes[k], points[:, k])
+
+        if (self.iord == 0):
+            nearest = idx + (lDist >= rDist)
+            return self.flat[np.dot(nearest, self.strides)]
+
+        # Weight of each corner is the product of its per-axis linear weights
+        t = lDist/(lDist + rDist)
+        weights = np.prod(np.where(self.corners[None, :, :] == 1, t[:, None, :], 1 - t[:, None, :]), axis=2)
+        base = np.dot(idx, self.strides)
+        return np.sum(weights*self.flat[base[:, None] + self.cornerOffsets[None, :]], axis=1)
+
+# Example function of any number of variables
+def fn(*x):
+    return np.cos(sum(xk**2 for xk in x))
+
+def main():
+    nres = [4, 8, 16, 32]  # The grid resolutions
+    nrand = 10000  # The number of random points to be interpolated
+
+    for d in [3, 4]:
+        # Random query points in the box [-1, 1]^d
+        points = 2*np.random.rand(nrand, d) - 1
+        ftrue = fn(*points.T)
+
+        print("%-*s%-*s%-*s" % (20, 'Resolution (d=' + str(d) + ')', 20, 'Nearest RMSE', 20, 'Multilinear RMSE'))
+        for n in nres:
+            axes = [np.linspace(-1, 1, n) for k in range(d)]
+            values = fn(*np.meshgrid(*axes, indexing='ij'))
+
+            fint0 = RegularGridInterpolant(axes, values, 0)(points)
+            fint1 = RegularGridInterpolant(axes, values, 1)(points)
+            rmse0 = np.sqrt(np.mean((fint0 - ftrue)**2))
+            rmse1 = np.sqrt(np.mean((fint1 - ftrue)**2))
+            print("%-*s%-*s%-*s" % (20, n, 20, rmse0, 20, rmse1))
+        print()
+
+main()
\ No newline at end of file
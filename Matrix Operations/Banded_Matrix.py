@@ -0,0 +1,189 @@
+# Solving of banded and tridiagonal matrix systems using compact diagonal storage
+
+import numpy as np
+
+# Packs the band of a matrix into LAPACK-style diagonal-major storage
+# Inputs
+#	M: matrix to pack
+#	lower: number of diagonals below the main diagonal
+#	upper: number of diagonals above the main diagonal
+# Returns
+#	ab: (lower + upper + 1) x n array with ab[upper + i - j, j] = M[i, j]
+def toBanded(M, lower, upper):
+    n = M.shape[0]
+    ab = np.zeros((lower + upper + 1, n))
+
+    for d in range(-min(lower, n - 1), min(upper, n - 1) + 1):
+        ab[upper - d, max(d, 0):n + min(d, 0)] = np.diagonal(M, d)
+
+    return ab
+
+# Multiplies a matrix in banded storage by a vector
+# Inputs
+#	ab: banded storage of the matrix
+#	lower: number of diagonals below the main diagonal
+#	upper: number of diagonals above the main diagonal
+#	v: vector to multiply
+# Returns
+#	b: the product vector
+def bandedDot(ab, lower, upper, v):
+    n = ab.shape[1]
+    b = np.zeros(n)
+
+    for d in range(-min(lower, n - 1), min(upper, n - 1) + 1):
+        b[max(-d, 0):n - max(d, 0)] += ab[upper - d, max(d, 0):n + min(d, 0)]*v[max(d, 0):n + min(d, 0)]
+
+    return b
+
+# Solves a tridiagonal system using the Thomas algorithm
+# Inputs
+#	a: sub-diagonal, a[i] = M[i + 1, i]
+#	b: main diagonal
+#	c: super-diagonal, c[i] = M[i, i + 1]
+#	d: product vector, or n x k array with one right-hand side per column
+# Returns
+#	x: solution with the same shape as d
+def thomas(a, b, c, d):
+
+    n = len(b)
+    cp = np.zeros(n)
+    x = np.array(d, dtype=float)
+
+    # Forward elimination
+    cp[0] = c[0]/b[0] if n > 1 else 0
+    x[0] /= b[0]
+    for i in range(1, n):
+        denom = b[i] - a[i - 1]*cp[i - 1]
+        if (i < n - 1):
+            cp[i] = c[i]/denom
+        x[i] = (x[i] - a[i - 1]*x[i - 1])/denom
+
+    # Back substitution
+    for i in range(n - 2, -1, -1):
+        x[i] -= cp[i]*x[i + 1]
+
+    return x
+
+# LU decomposition of a banded matrix with partial pivoting, kept in banded storage as in LAPACK gbtrf
+# Row interchanges let U fill in up to lower + upper diagonals above the main diagonal, so the factors
+# are stored with lower extra superdiagonals
+# Costs O(n*lower*(lower + upper)) time and O(n*(2*lower + upper)) memory
+# Inputs
+#	ab: banded storage of the matrix, as returned by toBanded
+#	lower: number of diagonals below the main diagonal
+#	upper: number of diagonals above the main diagonal
+# Attributes
+#	LU: (2*lower + upper + 1) x n banded storage with LU[lower + upper + i - j, j] holding U[i, j] for
+#	    i <= j and the multipliers of L (unit diagonal implied) for i > j
+#	piv: row interchanges, so that row k was swapped with row piv[k] at step k
+class BandedLUFactorization:
+
+    def __init__(self, ab, lower, upper):
+
+        n = ab.shape[1]
+        ku = lower + upper
+        LU = np.zeros((ku + lower + 1, n))
+        LU[lower:] = ab
+        piv = np.arange(n)
+
+        rowOffset = np.arange(1, lower + 1)
+        colOffset = np.arange(1, ku + 1)
+
+        for k in range(n):
+            m = min(lower, n - 1 - k)
+            q = min(ku, n - 1 - k)
+
+            # Largest entry in column k on or below the diagonal becomes the pivot
+            p = np.argmax(np.abs(LU[ku:ku + m + 1, k]))
+            if (LU[ku + p, k] == 0):
+                raise np.linalg.LinAlgError("Error: singular matrix")
+            piv[k] = k + p
+            if (p > 0):
+                cols = k + np.arange(q + 1)
+                rowk = LU[ku + k - cols, cols].copy()
+                LU[ku + k - cols, cols] = LU[ku + k + p - cols, cols]
+                LU[ku + k + p - cols, cols] = rowk
+
+            LU[ku + 1:ku + 1 + m, k] /= LU[ku, k]
+
+            # A[k + r, k + s] -= L[k + r, k]*U[k, k + s] for the m x q block below and right of the pivot
+            r = rowOffset[:m]
+            s = colOffset[:q]
+            LU[ku + r[:, None] - s[None, :], k + s[None, :]] -= np.outer(LU[ku + r, k], LU[ku - s, k + s])
+
+        self.LU = LU
+        self.piv = piv
+        self.lower = lower
+        self.upper = upper
+
+    # Solves the system Mx = B using the stored factors
+    # Inputs
+    #	B: product vector, or n x k array with one right-hand side per column
+    # Returns
+    #	x: solution with the same shape as B
+    def solve(self, B):
+
+        LU = self.LU
+        lower = self.lower
+        ku = self.lower + self.upper
+        n = LU.shape[1]
+        x = np.array(B, dtype=float)
+        if (x.ndim == 1):
+            x = x[:, None]
+            single = True
+        else:
+            single = False
+
+        for k in range(n - 1):
+            if (self.piv[k] != k):
+                x[[k, self.piv[k]]] = x[[self.piv[k], k]]
+            m = min(lower, n - 1 - k)
+            x[k + 1:k + 1 + m] -= np.outer(LU[ku + 1:ku + 1 + m, k], x[k])
+
+        for k in range(n - 1, -1, -1):
+            x[k] /= LU[ku, k]
+            q = min(ku, k)
+            x[k - q:k] -= np.outer(LU[ku - q:ku, k], x[k])
+
+        return x[:, 0] if single else x
+
+def main():
+
+    # Test case 1: tridiagonal system, as in cubic spline construction
+    n = 8
+    a = np.ones(n - 1)
+    b = 4*np.ones(n)
+    c = np.ones(n - 1)
+    d = np.arange(n, dtype=float)
+    x1 = thomas(a, b, c, d)
+    A1 = np.diag(b) + np.diag(a, -1) + np.diag(c, 1)
+    print("x1 from Thomas algorithm: " + str(x1))
+    print("Residual: " + str(np.linalg.norm(np.dot(A1, x1) - d)))
+
+    # Test case 2: same system through the banded LU
+    fact1 = BandedLUFactorization(toBanded(A1, 1, 1), 1, 1)
+    print("\nx1 from banded LU: " + str(fact1.solve(d)))
+
+    # Test case 3: large pentadiagonal system with two right-hand sides
+    n = 10000
+    ab = np.zeros((5, n))
+    ab[0] = ab[4] = -1
+    ab[1] = ab[3] = -2
+    ab[2] = 8
+    B = np.random.rand(n, 2)
+    fact3 = BandedLUFactorization(ab, 2, 2)
+    X3 = fact3.solve(B)
+    print("\nResidual of pentadiagonal system: " + str(np.linalg.norm(bandedDot(ab, 2, 2, X3[:, 0]) - B[:, 0])))
+    print("Stored entries: " + str(ab.size) + " of " + str(n*n))
+
+    # Test case 4: banded systems that need row interchanges
+    A4 = np.array([[0., 1],
+                   [1, 0]])
+    print("\nx4 from banded LU: " + str(BandedLUFactorization(toBanded(A4, 1, 1), 1, 1).solve([2, 3])))
+    n = 200
+    A5 = np.triu(np.tril(np.random.rand(n, n) - 0.5, 2), -3)
+    b5 = np.random.rand(n)
+    x5 = BandedLUFactorization(toBanded(A5, 3, 2), 3, 2).solve(b5)
+    print("Residual of unsymmetric banded system: " + str(np.linalg.norm(np.dot(A5, x5) - b5)))
+
+main()
\ No newline at end of file
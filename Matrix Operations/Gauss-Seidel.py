@@ -3,74 +3,42 @@
 import numpy as np
 import matplotlib.pyplot as plt
 
-# Solves the system Mx = b using Gauss-Seidel iteration
+# Solves the system Mx = b using Gauss-Seidel iteration with successive over-relaxation
 # Inputs
 #	M: matrix in the system
 #	b: product vector
 #	tol: tolerance of norm of error vector
+#	omega: relaxation factor, 1 for plain Gauss-Seidel, between 1 and 2 for SOR
+#	symmetric: if True, follow each forward sweep with a backward sweep (SSOR)
 # Returns
-#	xnew: solution vector
+#	x: solution vector
 #	iterations: number of iterations used
-def gaussseidel(M, b, tol):
+def gaussseidel(M, b, tol, omega=1.0, symmetric=False):
 
-    M = M.astype(float)
-    b = b.astype(float)
-    
-    xold = np.zeros(b.size)
-    xnew = np.zeros(b.size)
-    
-    L = np.zeros(M.shape)
-    U = np.copy(M)
-    
-    for i in range(M.shape[0]):
-        xnew[i] = b[i]/M[i, i]
-        for j in range(i+1):
-            L[i, j] = U[i, j]
-            U[i, j] = 0
-    
-    Linv = triangleInverseLower(L)
-        
+    M = np.asarray(M, dtype=float)
+    b = np.asarray(b, dtype=float)
+
+    n = b.size
+    x = b/np.diagonal(M)
+    change = np.linalg.norm(x)
+
+    # Rows visited per iteration: forward, then backward for SSOR
+    order = list(range(n))
+    if (symmetric):
+        order += list(range(n - 1, -1, -1))
+
+    # Substitution sweeps, updating x in place with the newest values
     iterations = 0
-    while(np.linalg.norm(xnew - xold) > tol):
+    while(change > tol):
         iterations += 1
-        xold = np.copy(xnew)
-        xnew = np.dot(Linv, b - np.dot(U, xold))
-    
-    return (xnew, iterations)
+        change = 0.0
+        for i in order:
+            dx = omega*(b[i] - np.dot(M[i], x))/M[i, i]
+            x[i] += dx
+            change += dx*dx
+        change = np.sqrt(change)
 
-# Finds the inverse of a lower-triangular matrix
-# Inputs
-#	M: matrix to invert
-# Returns
-#	Minv: inverted matrix
-def triangleInverseLower(M):
-    Minv = np.zeros(M.shape)
-    
-    for i in range(M.shape[0]):
-        b = np.zeros(M.shape[0])
-        b[i] = 1
-        col = triSolveLower(M, b)
-        for j in range(M.shape[0]):
-            Minv[j, i] = col[j]
-    
-    return Minv
-
-# Solves a lower-triangular matrix system
-# Inputs
-#	M: matrix in the system
-#	b: product vector
-# Returns
-#	x: solution vector
-def triSolveLower(M, b):
-    x = np.zeros(b.size)
-    
-    for i in range(b.size):
-        rowSum = b[i]
-        for j in range(i):
-            rowSum -= M[i, j]*x[j] 
-        x[i] = rowSum / M[i, i]
-        
-    return x
+    return (x, iterations)
 
 def main():
     tol = 1e-4
@@ -90,5 +58,10 @@ def main():
     x2 = gaussseidel(A2, b2, tol)
     print("x2: " + str(x2[0]) + "\n")
     print("Iterations: " + str(x2[1]))
-    
+
+    # Test case 1 with over-relaxation
+    x1sor = gaussseidel(A1, b1, tol, omega=1.66)
+    print("x1 from SOR: " + str(x1sor[0]) + "\n")
+    print("Iterations: " + str(x1sor[1]))
+
 main()
\ No newline at end of file
@@ -27,6 +27,55 @@ def gausselim(M, b):
     
     return x
 
+# Solves a stack of systems M[k]x[k] = b[k] in lockstep with partial pivoting
+# Inputs
+#	M: array of shape (batch, n, n) holding one matrix per system
+#	b: array of shape (batch, n) holding one product vector per system
+# Returns
+#	x: array of shape (batch, n) of solution vectors (nan for singular systems)
+#	singular: boolean array of shape (batch,), True where a pivot was zero up to roundoff
+def gausselimBatch(M, b):
+
+    A = np.array(M, dtype=float)
+    x = np.array(b, dtype=float)
+
+    batch, n = x.shape
+    rows = np.arange(batch)
+    singular = np.zeros(batch, dtype=bool)
+
+    # Pivots this small relative to the largest entry of their own original row are roundoff from
+    # cancellation; each row keeps its tolerance through the swaps, so badly scaled rows are not flagged
+    tol = n*np.finfo(float).eps*np.abs(A).max(axis=2, initial=0)
+
+    for i in range(n):
+        # Swap the largest remaining entry of column i into the pivot row of every system
+        p = i + np.argmax(np.abs(A[:, i:, i]), axis=1)
+        rowi = A[rows, i].copy()
+        A[rows, i] = A[rows, p]
+        A[rows, p] = rowi
+        xi = x[rows, i].copy()
+        x[rows, i] = x[rows, p]
+        x[rows, p] = xi
+        toli = tol[rows, i].copy()
+        tol[rows, i] = tol[rows, p]
+        tol[rows, p] = toli
+
+        zero = (np.abs(A[:, i, i]) <= tol[:, i])
+        singular |= zero
+        A[zero, i, i] = 1
+
+        factors = A[:, i+1:, i] / A[:, i, i, None]
+        A[:, i+1:, i:] -= factors[:, :, None] * A[:, None, i, i:]
+        x[:, i+1:] -= factors * x[:, i, None]
+
+    for i in range(n - 1, -1, -1):
+        x[:, i] -= np.einsum('kj,kj->k', A[:, i, i+1:], x[:, i+1:])
+        x[:, i] /= A[:, i, i]
+
+    x[singular] = np.nan
+
+    return (x, singular)
+
 def testCase(A, b, number):
     x = gausselim(A, b)
     print("x" + number + ": " + str(x))
@@ -57,4 +106,25 @@ def main():
     b3alt = np.array([1.98, 2.02])
     testCase(A3, b3alt, "3alt")
 
+    # Batched case: test case 1 next to a singular system, one singular only up to roundoff,
+    # and a nonsingular one whose rows differ greatly in scale
+    A4 = np.array([[[4, -2, 1],
+                    [-3, -1, 4],
+                    [1, -1, 3]],
+                   [[1, 2, 3],
+                    [2, 4, 6],
+                    [1, 0, 1]],
+                   [[1, 2, 3],
+                    [4, 5, 6],
+                    [7, 8, 9]],
+                   [[1e20, 1e20, 0],
+                    [0, 1, 2],
+                    [0, 0, 1e-17]]])
+    b4 = np.array([[15, 8, 13],
+                   [1, 2, 3],
+                   [1, 2, 3],
+                   [2e20, 3, 1e-17]])
+    x4, singular4 = gausselimBatch(A4, b4)
+    print("x4: " + str(x4) + "\nSingular: " + str(singular4))
+
 main()
\ No newline at end of file
@@ -0,0 +1,224 @@
+# Solving of matrix systems using Krylov subspace methods (conjugate gradient, GMRES, BiCGSTAB)
+
+import numpy as np
+
+# Wraps a matrix so it can be applied to a vector
+# Inputs
+#	M: matrix in the system, or a function returning the product M*v
+# Returns
+#	matvec: function returning the product M*v
+def asMatvec(M):
+    if (callable(M)):
+        return M
+    M = np.asarray(M, dtype=float)
+    return lambda v: np.dot(M, v)
+
+# Builds a Jacobi (diagonal) preconditioner
+# Inputs
+#	M: matrix in the system, or its diagonal as a vector
+# Returns
+#	precond: function returning D^-1 * r
+def jacobiPreconditioner(M):
+    M = np.asarray(M, dtype=float)
+    Dinv = 1/(M if M.ndim == 1 else np.diagonal(M))
+    return lambda r: Dinv*r
+
+# Solves the symmetric positive-definite system Mx = b using the conjugate gradient method
+# Inputs
+#	M: matrix in the system, or a function returning the product M*v
+#	b: product vector
+#	tol: tolerance of norm of residual vector
+#	precond: optional function applying the inverse of a preconditioner to a vector
+#	maxiter: maximum number of iterations, 10 times the size of b by default
+# Returns
+#	x: solution vector
+#	iterations: number of iterations used
+def conjugateGradient(M, b, tol, precond=None, maxiter=None):
+
+    matvec = asMatvec(M)
+    b = np.asarray(b, dtype=float)
+    if (precond is None):
+        precond = lambda r: r
+    if (maxiter is None):
+        maxiter = 10*b.size
+
+    x = np.zeros(b.size)
+    r = np.copy(b)
+    z = precond(r)
+    p = np.copy(z)
+    rz = np.dot(r, z)
+
+    iterations = 0
+    while(np.linalg.norm(r) > tol and iterations < maxiter):
+        iterations += 1
+        Mp = matvec(p)
+        alpha = rz/np.dot(p, Mp)
+        x += alpha*p
+        r -= alpha*Mp
+        z = precond(r)
+        rzNew = np.dot(r, z)
+        p = z + (rzNew/rz)*p
+        rz = rzNew
+
+    return (x, iterations)
+
+# Solves the system Mx = b using the stabilized biconjugate gradient method
+# Inputs
+#	M: matrix in the system, or a function returning the product M*v
+#	b: product vector
+#	tol: tolerance of norm of residual vector
+#	precond: optional function applying the inverse of a preconditioner to a vector
+#	maxiter: maximum number of iterations, 10 times the size of b by default
+# Returns
+#	x: solution vector
+#	iterations: number of iterations used
+def bicgstab(M, b, tol, precond=None, maxiter=None):
+
+    matvec = asMatvec(M)
+    b = np.asarray(b, dtype=float)
+    if (precond is None):
+        precond = lambda r: r
+    if (maxiter is None):
+        maxiter = 10*b.size
+
+    x = np.zeros(b.size)
+    r = np.copy(b)
+    rhat = np.copy(b)
+    p = np.zeros(b.size)
+    v = np.zeros(b.size)
+    rho = alpha = omega = 1.0
+
+    iterations = 0
+    while(np.linalg.norm(r) > tol and iterations < maxiter):
+        iterations += 1
+        rhoNew = np.dot(rhat, r)
+        if (rhoNew == 0):
+            break
+        p = r + (rhoNew/rho)*(alpha/omega)*(p - omega*v)
+        phat = precond(p)
+        v = matvec(phat)
+        alpha = rhoNew/np.dot(rhat, v)
+        s = r - alpha*v
+        x += alpha*phat
+        if (np.linalg.norm(s) <= tol):
+            r = s
+            break
+        shat = precond(s)
+        t = matvec(shat)
+        omega = np.dot(t, s)/np.dot(t, t)
+        x += omega*shat
+        r = s - omega*t
+        rho = rhoNew
+
+    return (x, iterations)
+
+# Solves the system Mx = b using restarted GMRES with right preconditioning
+# Inputs
+#	M: matrix in the system, or a function returning the product M*v
+#	b: product vector
+#	tol: tolerance of norm of residual vector
+#	restart: number of iterations between restarts (size of the Krylov basis)
+#	precond: optional function applying the inverse of a preconditioner to a vector
+#	maxiter: maximum number of iterations, 10 times the size of b by default
+# Returns
+#	x: solution vector
+#	iterations: number of iterations used
+def gmres(M, b, tol, restart=30, precond=None, maxiter=None):
+
+    matvec = asMatvec(M)
+    b = np.asarray(b, dtype=float)
+    if (precond is None):
+        precond = lambda r: r
+    if (maxiter is None):
+        maxiter = 10*b.size
+
+    n = b.size
+    x = np.zeros(n)
+    r = np.copy(b)
+    beta = np.linalg.norm(r)
+
+    iterations = 0
+    while(beta > tol and iterations < maxiter):
+        V = np.zeros((restart + 1, n))
+        Z = np.zeros((restart, n))
+        H = np.zeros((restart + 1, restart))
+        cs = np.zeros(restart)
+        sn = np.zeros(restart)
+        g = np.zeros(restart + 1)
+        g[0] = beta
+        V[0] = r/beta
+
+        for j in range(restart):
+            iterations += 1
+
+            # Arnoldi step with modified Gram-Schmidt
+            Z[j] = precond(V[j])
+            w = matvec(Z[j])
+            for i in range(j + 1):
+                H[i, j] = np.dot(w, V[i])
+                w -= H[i, j]*V[i]
+            H[j + 1, j] = np.linalg.norm(w)
+            if (H[j + 1, j] != 0):
+                V[j + 1] = w/H[j + 1, j]
+
+            # Givens rotations keep H upper triangular
+            for i in range(j):
+                temp = cs[i]*H[i, j] + sn[i]*H[i + 1, j]
+                H[i + 1, j] = -sn[i]*H[i, j] + cs[i]*H[i + 1, j]
+                H[i, j] = temp
+            denom = np.hypot(H[j, j], H[j + 1, j])
+            cs[j] = H[j, j]/denom
+            sn[j] = H[j + 1, j]/denom
+            H[j, j] = denom
+            H[j + 1, j] = 0
+            g[j + 1] = -sn[j]*g[j]
+            g[j] = cs[j]*g[j]
+
+            if (np.abs(g[j + 1]) <= tol or iterations >= maxiter):
+                break
+
+        # Back substitution for the least-squares coefficients
+        k = j + 1
+        y = np.zeros(k)
+        for i in range(k - 1, -1, -1):
+            y[i] = (g[i] - np.dot(H[i, i+1:k], y[i+1:])) / H[i, i]
+
+        x += np.dot(y, Z[:k])
+        r = b - matvec(x)
+        beta = np.linalg.norm(r)
+
+    return (x, iterations)
+
+def main():
+    tol = 1e-4
+
+    # Test case 1
+    A1 = np.array([[1.01, 0.99],
+                   [0.99, 1.01]])
+    b1 = np.array([2, 2])
+    x1 = conjugateGradient(A1, b1, tol)
+    print("x1 from conjugate gradient: " + str(x1[0]) + "\n")
+    print("Iterations: " + str(x1[1]))
+
+    # Test case 2: symmetric positive-definite system with a widely varying diagonal
+    n = 200
+    A2 = np.diag(np.linspace(1, 1000, n)) + np.diag(-0.5*np.ones(n - 1), 1) + np.diag(-0.5*np.ones(n - 1), -1)
+    b2 = np.ones(n)
+    x2 = conjugateGradient(A2, b2, tol)
+    x2p = conjugateGradient(A2, b2, tol, precond=jacobiPreconditioner(A2))
+    print("\nIterations for conjugate gradient: " + str(x2[1]))
+    print("Iterations with Jacobi preconditioner: " + str(x2p[1]))
+
+    # Test case 3: nonsymmetric system given only as a product function
+    def A3(v):
+        Av = 4*v
+        Av[1:] -= 1.5*v[:-1]
+        Av[:-1] -= 0.5*v[1:]
+        return Av
+    b3 = np.ones(n)
+    x3g = gmres(A3, b3, tol)
+    x3b = bicgstab(A3, b3, tol)
+    print("\nResidual from GMRES: " + str(np.linalg.norm(A3(x3g[0]) - b3)) + "\nIterations: " + str(x3g[1]))
+    print("Residual from BiCGSTAB: " + str(np.linalg.norm(A3(x3b[0]) - b3)) + "\nIterations: " + str(x3b[1]))
+
+main()
\ No newline at end of file
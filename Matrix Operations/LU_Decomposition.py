@@ -1,5 +1,9 @@
 # Solving of matrix systems using LU decomposition
 
+import os
+import tempfile
+import hashlib
+from collections import OrderedDict
 import numpy as np
 
 # Performs LU decomposition on a matrix M
@@ -10,17 +14,275 @@ import numpy as np
 def ludecomp(M):
 
     LU = M.astype(float)
-    
+
     for i in range(LU.shape[0]):
         if (LU[i, i] == 0):
             return "Error: zero pivot"
-        for j in range(i + 1, LU.shape[1]):
-            for k in range(LU.shape[1] - 1, i, -1):
-                LU[j, k] -= LU[i, k] * (LU[j, i] / LU[i, i])
-            LU[j, i] = LU[j, i] / LU[i, i]
-    
+        LU[i+1:, i] /= LU[i, i]
+        LU[i+1:, i+1:] -= np.outer(LU[i+1:, i], LU[i, i+1:])
+
     return LU
 
+# Packed LU decomposition with partial pivoting, factored once and reused for many solves
+# Inputs
+#	M: square matrix to decompose
+#	blockSize: number of columns eliminated per panel before the trailing update
+#	dtype: floating-point type used for the factors and the substitutions
+# Attributes
+#	LU: lower (unit diagonal implied) and upper matricies packed together
+#	perm: row permutation vector, so that M[perm] = L*U
+class LUFactorization:
+
+    def __init__(self, M, blockSize=64, dtype=float):
+
+        LU = np.array(M, dtype=dtype)
+        n = LU.shape[0]
+        perm = np.arange(n)
+
+        for k in range(0, n, blockSize):
+            e = min(k + blockSize, n)
+
+            # Factor the panel of columns k..e with row-rank-1 updates
+            for i in range(k, e):
+                p = i + np.argmax(np.abs(LU[i:, i]))
+                if (LU[p, i] == 0):
+                    raise np.linalg.LinAlgError("Error: singular matrix")
+                if (p != i):
+                    LU[[i, p]] = LU[[p, i]]
+                    perm[[i, p]] = perm[[p, i]]
+                LU[i+1:, i] /= LU[i, i]
+                LU[i+1:, i+1:e] -= np.outer(LU[i+1:, i], LU[i, i+1:e])
+
+            if (e < n):
+                # Block row of U, then a single matrix product for the trailing submatrix
+                for i in range(k + 1, e):
+                    LU[i, e:] -= np.dot(LU[i, k:i], LU[k:i, e:])
+                LU[e:, e:] -= np.dot(LU[e:, k:e], LU[k:e, e:])
+
+        self.LU = LU
+        self.perm = perm
+
+    # Solves the system Mx = B using the stored factors
+    # Inputs
+    #	B: product vector, or n x k array with one right-hand side per column
+    # Returns
+    #	x: solution with the same shape as B
+    def solve(self, B):
+
+        LU = self.LU
+        x = np.asarray(B, dtype=LU.dtype)[self.perm]
+
+        for i in range(1, x.shape[0]):
+            x[i] -= np.dot(LU[i, :i], x[:i])
+
+        for i in range(x.shape[0] - 1, -1, -1):
+            x[i] -= np.dot(LU[i, i+1:], x[i+1:])
+            x[i] /= LU[i, i]
+
+        return x
+
+# Packed LU decomposition with partial pivoting for matricies too large for memory
+# The factors are written to a memory-mapped file one column panel at a time (left-looking),
+# so only the current n x tileSize panel and one tileSize x tileSize tile are held in memory
+# Inputs
+#	M: square matrix to decompose, typically an np.memmap
+#	path: file to hold the factors
+#	tileSize: width of the column panels and size of the square tiles streamed from disk
+# Attributes
+#	LU: memory-mapped packed factors, stored by original row so row i of the factors is LU[perm[i]]
+#	perm: row permutation vector, so that M[perm] = L*U
+class OutOfCoreLUFactorization:
+
+    def __init__(self, M, path, tileSize=1024):
+
+        n = M.shape[0]
+        t = tileSize
+        LU = np.memmap(path, dtype=float, mode='w+', shape=(n, n))
+        perm = np.arange(n)
+
+        for c0 in range(0, n, t):
+            c1 = min(c0 + t, n)
+            P = np.array(M[:, c0:c1], dtype=float)[perm]
+
+            # Apply the earlier panels, streaming their factors tile by tile
+            for k0 in range(0, c0, t):
+                k1 = min(k0 + t, c0)
+                Lkk = LU[perm[k0:k1], k0:k1]
+                for i in range(1, k1 - k0):
+                    P[k0 + i] -= np.dot(Lkk[i, :i], P[k0:k0 + i])
+                for r0 in range(k1, n, t):
+                    r1 = min(r0 + t, n)
+                    P[r0:r1] -= np.dot(LU[perm[r0:r1], k0:k1], P[k0:k1])
+
+            # Factor the panel below the diagonal with row-rank-1 updates
+            for i in range(c1 - c0):
+                r = c0 + i
+                p = r + np.argmax(np.abs(P[r:, i]))
+                if (P[p, i] == 0):
+                    raise np.linalg.LinAlgError("Error: singular matrix")
+                if (p != r):
+                    P[[r, p]] = P[[p, r]]
+                    perm[[r, p]] = perm[[p, r]]
+                P[r+1:, i] /= P[r, i]
+                P[r+1:, i+1:] -= np.outer(P[r+1:, i], P[r, i+1:])
+
+            for r0 in range(0, n, t):
+                r1 = min(r0 + t, n)
+                LU[perm[r0:r1], c0:c1] = P[r0:r1]
+
+        LU.flush()
+        self.LU = LU
+        self.perm = perm
+        self.tileSize = tileSize
+
+    # Reads the tile of the factors covering rows r0..r1 and columns c0..c1
+    def tile(self, r0, r1, c0, c1):
+        return self.LU[self.perm[r0:r1], c0:c1]
+
+    # Solves the system Mx = B using the stored factors
+    # Inputs
+    #	B: product vector, or n x k array with one right-hand side per column
+    # Returns
+    #	x: solution with the same shape as B
+    def solve(self, B):
+
+        n = self.perm.size
+        t = self.tileSize
+        x = np.asarray(B, dtype=float)[self.perm]
+        blocks = [(r0, min(r0 + t, n)) for r0 in range(0, n, t)]
+
+        for (r0, r1) in blocks:
+            for (k0, k1) in blocks:
+                if (k0 >= r0):
+                    break
+                x[r0:r1] -= np.dot(self.tile(r0, r1, k0, k1), x[k0:k1])
+            D = self.tile(r0, r1, r0, r1)
+            for i in range(1, r1 - r0):
+                x[r0 + i] -= np.dot(D[i, :i], x[r0:r0 + i])
+
+        for (r0, r1) in reversed(blocks):
+            for (k0, k1) in blocks:
+                if (k0 >= r1):
+                    x[r0:r1] -= np.dot(self.tile(r0, r1, k0, k1), x[k0:k1])
+            D = self.tile(r0, r1, r0, r1)
+            for i in range(r1 - r0 - 1, -1, -1):
+                x[r0 + i] -= np.dot(D[i, i+1:], x[r0 + i + 1:r1])
+                x[r0 + i] /= D[i, i]
+
+        return x
+
+# Solves the system Mx = b by factoring in single precision and refining the solution in double precision
+# Refinement stops once the backward error ||b - Mx||/(||M||*||x||) reaches tol, or once the corrections
+# stop shrinking, which happens near the accuracy the conditioning of M allows
+# Falls back to a double-precision factorization only when the corrections grow or the backward error
+# stays far above tol
+# Inputs
+#	M: matrix in the system
+#	b: product vector
+#	tol: target backward error, the double-precision unit roundoff by default
+#	maxSteps: maximum number of refinement steps
+# Returns
+#	x: solution vector
+#	steps: number of refinement steps used
+#	fallback: True if the double-precision factorization was needed
+def mixedPrecisionSolve(M, b, tol=None, maxSteps=10):
+
+    M = np.asarray(M, dtype=float)
+    b = np.asarray(b, dtype=float)
+    if (tol is None):
+        tol = np.finfo(float).eps
+
+    try:
+        fact = LUFactorization(M, dtype=np.float32)
+    except np.linalg.LinAlgError:
+        return (LUFactorization(M).solve(b), 0, True)
+    x = fact.solve(b).astype(float)
+    Mnorm = np.linalg.norm(M, np.inf)
+
+    def backwardError(r):
+        scale = Mnorm*np.linalg.norm(x, np.inf)
+        return np.linalg.norm(r, np.inf)/scale if scale > 0 else np.linalg.norm(r, np.inf)
+
+    # Residuals in double precision, corrections from the single-precision factors
+    steps = 0
+    dnormOld = np.inf
+    while (steps < maxSteps):
+        r = b - np.dot(M, x)
+        if (backwardError(r) <= tol):
+            return (x, steps, False)
+        d = fact.solve(r).astype(float)
+        dnorm = np.linalg.norm(d)
+        if (dnorm >= dnormOld):
+            break
+        x += d
+        steps += 1
+        if (dnorm > 0.5*dnormOld):
+            break
+        dnormOld = dnorm
+
+    # Refinement has levelled off; keep x unless it is still far from double-precision accuracy
+    if (backwardError(b - np.dot(M, x)) <= 100*tol):
+        return (x, steps, False)
+
+    return (LUFactorization(M).solve(b), steps, True)
+
+# Least-recently-used cache of LU factorizations, keyed by matrix content
+# Inputs
+#	maxBytes: bound on the total size of the cached factors
+# Attributes
+#	hits, misses, evictions: counters for sizing the cache
+#	currentBytes: total size of the cached factors
+class LUCache:
+
+    def __init__(self, maxBytes):
+        self.maxBytes = maxBytes
+        self.entries = OrderedDict()
+        self.currentBytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Hashes the shape, type and contents of a matrix
+    def contentKey(self, M):
+        M = np.ascontiguousarray(M)
+        digest = hashlib.blake2b(M.view(np.uint8), digest_size=16)
+        digest.update(str((M.shape, M.dtype.str)).encode())
+        return digest.hexdigest()
+
+    # Returns the factorization of M, factoring and caching it on a miss
+    # Inputs
+    #	M: square matrix to decompose
+    #	key: optional user-supplied key identifying M, skips hashing the contents
+    # Returns
+    #	fact: LUFactorization of M
+    def factor(self, M, key=None):
+        if (key is None):
+            key = self.contentKey(M)
+
+        if (key in self.entries):
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        self.misses += 1
+        fact = LUFactorization(M)
+        size = fact.LU.nbytes + fact.perm.nbytes
+        if (size > self.maxBytes):
+            return fact
+
+        while (self.currentBytes + size > self.maxBytes):
+            oldKey, old = self.entries.popitem(last=False)
+            self.currentBytes -= old.LU.nbytes + old.perm.nbytes
+            self.evictions += 1
+
+        self.entries[key] = fact
+        self.currentBytes += size
+        return fact
+
+    # Solves the system Mx = B, reusing a cached factorization of M when available
+    def solve(self, M, B, key=None):
+        return self.factor(M, key).solve(B)
+
 # Uses an LU decomposition to solve the system LUx = b
 # Inputs
 #	L: lower matrix
@@ -99,4 +361,33 @@ def main():
     b3alt = np.array([1.98, 2.02])
     testCase(A3, b3alt, "3alt")
 
+    # Factor once with pivoting, then solve both right-hand sides of case 3 in one call
+    fact = LUFactorization(A3)
+    X3 = fact.solve(np.column_stack((b3, b3alt)))
+    print("x3 and x3alt from one factorization:\n" + str(X3))
+
+    # Out-of-core factorization of a matrix stored on disk, using 64 x 64 tiles
+    with tempfile.TemporaryDirectory() as folder:
+        n = 500
+        A4 = np.memmap(os.path.join(folder, "A4.dat"), dtype=float, mode='w+', shape=(n, n))
+        A4[:] = np.random.rand(n, n)
+        b4 = np.random.rand(n)
+        fact4 = OutOfCoreLUFactorization(A4, os.path.join(folder, "LU4.dat"), tileSize=64)
+        x4 = fact4.solve(b4)
+        print("Residual from out-of-core LU: " + str(np.linalg.norm(np.dot(A4, x4) - b4)))
+        del A4, fact4
+
+    # Single-precision factorization refined to double-precision accuracy
+    A5 = np.random.rand(1000, 1000)
+    b5 = np.random.rand(1000)
+    x5, steps5, fallback5 = mixedPrecisionSolve(A5, b5)
+    print("Residual from mixed precision: " + str(np.linalg.norm(np.dot(A5, x5) - b5)))
+    print("Refinement steps: " + str(steps5) + ", fallback: " + str(fallback5))
+
+    # Repeated solves with recurring matricies through a factorization cache too small to hold all three
+    cache = LUCache(maxBytes=256)
+    for A, b in [(A1, b1), (A3, b3), (A1, b1), (A2, b2), (A3, b3alt), (A1, b1)]:
+        cache.solve(A, b)
+    print("Cache hits: " + str(cache.hits) + ", misses: " + str(cache.misses) + ", evictions: " + str(cache.evictions))
+
 main()
\ No newline at end of file
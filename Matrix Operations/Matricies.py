@@ -5,26 +5,11 @@ import numpy as np
 # Finds the inverse of a triangular matrix (upper or lower)
 # Inputs
 #	M: matrix to be inverted
+#	lower: True for lower-triangular, False for upper, None to check the matrix
 # Returns
 #	Minv: the inverted matrix
-def triangleInverse(M):
-
-    upperOrLower = 0
-    for i in range(M.shape[0]):
-        for j in range(i):
-            if (M[i, j] != 0):
-                upperOrLower = 1
-    
-    Minv = np.zeros(M.shape)
-    
-    for i in range(M.shape[0]):
-        b = np.zeros(M.shape[0])
-        b[i] = 1
-        col = triSolve(M, b)
-        for j in range(M.shape[0]):
-            Minv[j, i] = col[j]
-    
-    return Minv
+def triangleInverse(M, lower=None):
+    return triSolve(M, np.eye(M.shape[0]), lower)
 
 # Multiplies a matrix M by a vector v
 # Inputs
@@ -46,42 +31,59 @@ def multiplyMatrixVector(M, v):
     
     return b
 
+# Checks whether a triangular matrix is lower-triangular
+# Inputs
+#	M: triangular matrix
+# Returns
+#	lower: True if any entry below the diagonal is nonzero
+def isLowerTriangular(M):
+    return bool(np.any(np.tril(M, -1)))
+
 # Solves the triangular system Mx = b
 # Inputs
 #	M: triangular matrix in product
-#	b: product vector
+#	b: product vector, or n x k array with one right-hand side per column
+#	lower: True for lower-triangular, False for upper, None to check the matrix
+#	blockSize: systems larger than this are split in two and solved recursively
 # Returns
-#	x: the solution to the system
-def triSolve(M, b):
-    
-	upperOrLower = 0
-    for i in range(M.shape[0]):
-        for j in range(i):
-            if (M[i, j] != 0):
-                upperOrLower = 1
+#	x: the solution to the system, with the same shape as b
+def triSolve(M, b, lower=None, blockSize=128):
 
-    x = np.zeros(b.size)
-    
-    if (upperOrLower == 0):
-        for i in range(b.size - 1, -1, -1):
-            rowSum = b[i]
-            for j in range(b.size - 1, i, -1):
-                rowSum -= M[i, j]*x[j] 
-            x[i] = rowSum / M[i, i]
-    elif (upperOrLower == 1):
-        for i in range(b.size):
-            rowSum = b[i]
-            for j in range(i):
-                rowSum -= M[i, j]*x[j] 
-            x[i] = rowSum / M[i, i]
+    M = np.asarray(M, dtype=float)
+    if (lower is None):
+        lower = isLowerTriangular(M)
+
+    x = np.array(b, dtype=float)
+    n = x.shape[0]
+
+    # Blocked recursion: solve one diagonal block, update the other half with a matrix product
+    if (n > blockSize):
+        h = n//2
+        if (lower):
+            x[:h] = triSolve(M[:h, :h], x[:h], True, blockSize)
+            x[h:] -= np.dot(M[h:, :h], x[:h])
+            x[h:] = triSolve(M[h:, h:], x[h:], True, blockSize)
+        else:
+            x[h:] = triSolve(M[h:, h:], x[h:], False, blockSize)
+            x[:h] -= np.dot(M[:h, h:], x[h:])
+            x[:h] = triSolve(M[:h, :h], x[:h], False, blockSize)
+        return x
+
+    # Row-vectorized substitution, all right-hand sides at once
+    if (lower):
+        for i in range(n):
+            x[i] -= np.dot(M[i, :i], x[:i])
+            x[i] /= M[i, i]
     else:
-        return "Invalid value for upperOrLower"
-        
+        for i in range(n - 1, -1, -1):
+            x[i] -= np.dot(M[i, i+1:], x[i+1:])
+            x[i] /= M[i, i]
+
     return x
 
 def main():
 
-	# Demo of operations
+    # Demo of operations
     A = np.array([[9, 0, 0],
                   [-4, 2, 0],
                   [1, 0, 5]])
@@ -102,5 +104,9 @@ def main():
     print("x1 from triSolve: " + str(x1t) + "\nx1 from inverse: " + str(x1i))
     print("\nx2 from triSolve: " + str(x2t) + "\nx2 from inverse: " + str(x2i))
     print("\nx3 from triSolve: " + str(x3t) + "\nx3 from inverse: " + str(x3i))
+
+    # All three right-hand sides in one pass, with the triangle kind given explicitly
+    X = triSolve(A, np.column_stack((b1, b2, b3)), lower=True)
+    print("\nx1, x2, x3 from one block solve:\n" + str(X))
     
 main()
\ No newline at end of file
@@ -0,0 +1,148 @@
+# Sparse matrix storage in compressed sparse row (CSR) format and sparse iterative solvers
+
+import numpy as np
+
+# Matrix stored in compressed sparse row format
+# Inputs
+#	indptr: row pointers, row i occupies entries indptr[i]..indptr[i+1] of indices and data
+#	indices: column index of each stored entry
+#	data: value of each stored entry
+#	shape: (rows, columns) of the matrix
+class CSRMatrix:
+
+    def __init__(self, indptr, indices, data, shape):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.data = np.asarray(data, dtype=float)
+        self.shape = shape
+
+        # Row of each stored entry, used for vectorized products
+        self.rowIndex = np.repeat(np.arange(shape[0]), np.diff(self.indptr))
+
+    # Builds a CSR matrix from the nonzero entries of a dense matrix
+    @classmethod
+    def fromDense(cls, M):
+        M = np.asarray(M, dtype=float)
+        rows, cols = np.nonzero(M)
+        return cls.fromTriplets(rows, cols, M[rows, cols], M.shape)
+
+    # Builds a CSR matrix from (row, column, value) triplets without forming a dense matrix
+    @classmethod
+    def fromTriplets(cls, rows, cols, vals, shape):
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        vals = np.asarray(vals, dtype=float)
+
+        order = np.lexsort((cols, rows))
+        indptr = np.zeros(shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=shape[0]), out=indptr[1:])
+
+        return cls(indptr, cols[order], vals[order], shape)
+
+    # Number of stored entries
+    def nnz(self):
+        return self.data.size
+
+    # Multiplies the matrix by the vector v
+    def dot(self, v):
+        return np.bincount(self.rowIndex, weights=self.data*v[self.indices], minlength=self.shape[0])
+
+    # Returns the main diagonal as a vector
+    def diagonal(self):
+        onDiag = (self.indices == self.rowIndex)
+        return np.bincount(self.rowIndex[onDiag], weights=self.data[onDiag], minlength=self.shape[0])
+
+    # Returns the matrix as a dense array
+    def toDense(self):
+        M = np.zeros(self.shape)
+        np.add.at(M, (self.rowIndex, self.indices), self.data)
+        return M
+
+# Solves the sparse system Mx = b using Jacobi iteration
+# Inputs
+#	M: CSRMatrix in the system
+#	b: product vector
+#	tol: tolerance of norm of error vector
+# Returns
+#	xnew: solution vector
+#	iterations: number of iterations used
+def sparseJacobi(M, b, tol):
+
+    b = b.astype(float)
+
+    Dinv = 1/M.diagonal()
+
+    xold = np.zeros(b.size)
+    xnew = Dinv*b
+
+    # x_{k+1} = D^-1 (b - R x_k) = x_k + D^-1 (b - M x_k)
+    iterations = 0
+    while(np.linalg.norm(xnew - xold) > tol):
+        iterations += 1
+        xold = xnew
+        xnew = xold + Dinv*(b - M.dot(xold))
+
+    return (xnew, iterations)
+
+# Solves the sparse system Mx = b using Gauss-Seidel iteration
+# Inputs
+#	M: CSRMatrix in the system
+#	b: product vector
+#	tol: tolerance of norm of error vector
+# Returns
+#	x: solution vector
+#	iterations: number of iterations used
+def sparseGaussSeidel(M, b, tol):
+
+    b = b.astype(float)
+
+    indptr = M.indptr
+    indices = M.indices
+    data = M.data
+    Dinv = 1/M.diagonal()
+
+    x = Dinv*b
+    change = np.linalg.norm(x)
+
+    # Each sweep updates x in place, row by row, using only the stored entries
+    iterations = 0
+    while(change > tol):
+        iterations += 1
+        change = 0.0
+        for i in range(b.size):
+            s = indptr[i]
+            e = indptr[i + 1]
+            dx = (b[i] - np.dot(data[s:e], x[indices[s:e]]))*Dinv[i]
+            x[i] += dx
+            change += dx*dx
+        change = np.sqrt(change)
+
+    return (x, iterations)
+
+def main():
+    tol = 1e-4
+
+    # Test case 1
+    A1 = CSRMatrix.fromDense(np.array([[1.01, 0.99],
+                                       [0.99, 1.01]]))
+    b1 = np.array([2, 2])
+    x1J = sparseJacobi(A1, b1, tol)
+    x1G = sparseGaussSeidel(A1, b1, tol)
+    print("x1 from Jacobi: " + str(x1J[0]) + "\nIterations: " + str(x1J[1]))
+    print("x1 from Gauss-Seidel: " + str(x1G[0]) + "\nIterations: " + str(x1G[1]) + "\n")
+
+    # Test case 2: diagonally dominant tridiagonal system built without a dense matrix
+    n = 10000
+    i = np.arange(n)
+    rows = np.concatenate((i, i[1:], i[:-1]))
+    cols = np.concatenate((i, i[:-1], i[1:]))
+    vals = np.concatenate((4*np.ones(n), -np.ones(n - 1), -np.ones(n - 1)))
+    A2 = CSRMatrix.fromTriplets(rows, cols, vals, (n, n))
+    b2 = np.ones(n)
+    x2J = sparseJacobi(A2, b2, tol)
+    x2G = sparseGaussSeidel(A2, b2, tol)
+    print("Stored entries: " + str(A2.nnz()) + " of " + str(n*n))
+    print("Residual from Jacobi: " + str(np.linalg.norm(A2.dot(x2J[0]) - b2)) + "\nIterations: " + str(x2J[1]))
+    print("Residual from Gauss-Seidel: " + str(np.linalg.norm(A2.dot(x2G[0]) - b2)) + "\nIterations: " + str(x2G[1]))
+
+main()
\ No newline at end of file